@@ -29,7 +29,7 @@ Output shows
 
 ## Usage
 
-usage: gpx-interpolate.py [-h] [-d DISTANCE] [-n NUM] [-i INTERVALTIME] [-v VELOCITY] [-s] [-b BEGINTIME] FILE [FILE ...]
+usage: gpx-interpolate.py [-h] [-d DISTANCE] [-n NUM] [-i INTERVALTIME] [-v VELOCITY] [-s] [-b BEGINTIME] [-m {pchip,linear}] FILE [FILE ...]
 
 interpolate GPX files using piecewise cubic Hermite splines
 
@@ -48,126 +48,316 @@ options:
   -s, --speed           add speed data to track
   -b BEGINTIME, --begintime BEGINTIME
                         set track begin time UTC [YYYYMMDD-HHMMSSZ]
+  -m {pchip,linear}, --method {pchip,linear}
+                        set interpolation method (default: pchip)
 """
 
 # imports
+import array
 import gpxpy
 import numpy as np
 from datetime import datetime, tzinfo, timezone
-from typing import Dict, List, Union, Optional
-from scipy.interpolate import pchip_interpolate
+from functools import partial
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Tuple, Union, Optional
+from scipy.interpolate import PchipInterpolator
+
+try:
+    from numba import njit, prange, set_num_threads
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+try:
+    from lxml import etree
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
 
 # types
-GPXData = Dict[str, Union[List[float], tzinfo, None]]
+GPXData = Dict[str, Union[np.ndarray, List[float], tzinfo, None]]
 
 # globals
 EARTH_RADIUS = 6371e3 # meters
 EPS = 1e-6 # seconds
+MAX_DELTA_EQUIRECT = np.radians(0.1) # radians, larger steps between trackpoints use the haversine formula
+DUPLICATE_EPS = 1e-9 # degrees, trackpoints closer in latitude and longitude are duplicates
+INTERPOLATION_METHODS = ('pchip', 'linear')
+GPX_NAMESPACES = ('http://www.topografix.com/GPX/1/0', 'http://www.topografix.com/GPX/1/1')
 
 # functions
-def gpx_interpolate(gpx_data: GPXData, distance: float = 1.0, num: Optional[int] = None) -> GPXData:
+def _has_data(values: Union[np.ndarray, List[float], None]) -> bool:
+    """
+    Returns True if values holds at least one trackpoint value.
+    """
+
+    return values is not None and len(values) > 0
+
+
+def gpx_interpolate(gpx_data: GPXData, distance: float = 1.0, num: Optional[int] = None, gpx_dist: Optional[np.ndarray] = None, method: str = 'pchip') -> GPXData:
     """
     Returns gpx_data interpolated with a spatial resolution distance using piecewise cubic Hermite splines.
     if num is passed, gpx_data is interpolated to num points and distance is ignored.
+    if gpx_dist is passed, gpx_data must be free of duplicates and gpx_dist is used as its distance (with elevation).
+    if method is 'linear', gpx_data is interpolated linearly instead.
     """
 
-    if all(gpx_data[i] in (None, []) for i in ('lat', 'lon', 'ele', 'tstamp')):
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError('method must be one of {}'.format(', '.join(INTERPOLATION_METHODS)))
+
+    if not any(_has_data(gpx_data[i]) for i in ('lat', 'lon', 'ele', 'tstamp')):
         return gpx_data
 
-    _gpx_data = gpx_remove_duplicates(gpx_data)
-    _gpx_dist = gpx_calculate_distance(_gpx_data, use_ele=True)
+    if gpx_dist is None:
+        _gpx_data, _gpx_dist = gpx_remove_duplicates_with_distance(gpx_data)
+    else:
+        _gpx_data, _gpx_dist = gpx_data, gpx_dist
 
     xi = np.cumsum(_gpx_dist)
-    yi = np.array([_gpx_data[i] for i in ('lat', 'lon', 'ele', 'tstamp') if _gpx_data[i]])
+    yi = np.vstack([np.asarray(_gpx_data[i], dtype=np.float64) for i in ('lat', 'lon', 'ele', 'tstamp') if _has_data(_gpx_data[i])])
 
     num = num if num is not None else int(np.ceil(xi[-1]/distance))
 
     x = np.linspace(xi[0], xi[-1], num=num, endpoint=True)
-    y = pchip_interpolate(xi, yi, x, axis=1)
 
-    gpx_data_interp = {'lat': list(y[0, :]),
-                       'lon': list(y[1, :]),
-                       'ele': list(y[2, :]) if gpx_data['ele'] else None,
-                       'tstamp': list(y[-1, :]) if gpx_data['tstamp'] else None,
+    if method == 'linear':
+        y = np.vstack([np.interp(x, xi, yi_k) for yi_k in yi])
+    else:
+        pchip = PchipInterpolator(xi, yi, axis=1, extrapolate=False) # derivatives are computed once for all channels
+        y = pchip(x)
+
+    gpx_data_interp = {'lat': y[0, :],
+                       'lon': y[1, :],
+                       'ele': y[2, :] if _has_data(gpx_data['ele']) else None,
+                       'tstamp': y[-1, :] if _has_data(gpx_data['tstamp']) else None,
                        'tzinfo': gpx_data['tzinfo']}
 
     return gpx_data_interp
 
-def gpx_calculate_distance(gpx_data: GPXData, use_ele: bool = True) -> List[float]:
+
+def _haversine_kernel_numpy(lat, lon, ele, use_ele, R):
     """
-    Returns the distance between GPX trackpoints.
-    if use_ele is True and gpx_data['ele'] is not None, the elevation data is used to compute the distance.
+    Returns the distance between consecutive points (lat, lon in radians) using NumPy array operations.
     """
 
-    gpx_dist = np.zeros(len(gpx_data['lat']))
+    lat1 = lat[:-1]
+    lat2 = lat[1:]
+
+    delta_lat = np.diff(lat)
+    delta_lon = np.diff(lon)
+
+    dist_latlon = R*np.hypot(delta_lon*np.cos(0.5*(lat1+lat2)), delta_lat) # equirectangular approximation
+
+    i_far = np.nonzero((np.abs(delta_lat) > MAX_DELTA_EQUIRECT) | (np.abs(delta_lon) > MAX_DELTA_EQUIRECT))[0]
+
+    if len(i_far) > 0:
+        c = 2.0*np.arcsin(np.sqrt(np.sin(delta_lat[i_far]/2.0)**2+np.cos(lat1[i_far])*np.cos(lat2[i_far])*np.sin(delta_lon[i_far]/2.0)**2)) # haversine formula
+
+        dist_latlon[i_far] = R*c # great-circle distance
+
+    dist = np.zeros(len(lat))
 
-    for i in range(len(gpx_dist)-1):
-        lat1 = np.radians(gpx_data['lat'][i])
-        lon1 = np.radians(gpx_data['lon'][i])
-        lat2 = np.radians(gpx_data['lat'][i+1])
-        lon2 = np.radians(gpx_data['lon'][i+1])
+    if use_ele:
+        dist[1:] = np.hypot(dist_latlon, np.diff(ele))
+    else:
+        dist[1:] = dist_latlon
+
+    return dist
+
+
+if HAS_NUMBA:
+    @njit(fastmath=True, cache=True)
+    def _latlon_distance(lat1, lon1, lat2, lon2, R):
+        """
+        Returns the distance between two points (lat, lon in radians).
+        """
 
         delta_lat = lat2-lat1
         delta_lon = lon2-lon1
 
-        c = 2.0*np.arcsin(np.sqrt(np.sin(delta_lat/2.0)**2+np.cos(lat1)*np.cos(lat2)*np.sin(delta_lon/2.0)**2)) # haversine formula
-
-        dist_latlon = EARTH_RADIUS*c # great-circle distance
+        if abs(delta_lat) > MAX_DELTA_EQUIRECT or abs(delta_lon) > MAX_DELTA_EQUIRECT:
+            a = np.sin(delta_lat*0.5)**2+np.cos(lat1)*np.cos(lat2)*np.sin(delta_lon*0.5)**2 # haversine formula
 
-        if gpx_data['ele'] and use_ele:
-            dist_ele = gpx_data['ele'][i+1]-gpx_data['ele'][i]
-            gpx_dist[i+1] = np.sqrt(dist_latlon**2+dist_ele**2)
+            return 2.0*R*np.arcsin(np.sqrt(a)) # great-circle distance
         else:
-            gpx_dist[i+1] = dist_latlon
+            x = delta_lon*np.cos(0.5*(lat1+lat2))
+
+            return R*np.sqrt(x*x+delta_lat*delta_lat) # equirectangular approximation
+
+    @njit(fastmath=True, parallel=True, cache=True)
+    def _haversine_kernel(lat, lon, ele, use_ele, R):
+        """
+        Returns the distance between consecutive points (lat, lon in radians) in a single fused pass.
+        """
+
+        n = len(lat)
+        dist = np.zeros(n)
+
+        for i in prange(1, n):
+            d = _latlon_distance(lat[i-1], lon[i-1], lat[i], lon[i], R)
+
+            if use_ele:
+                dist_ele = ele[i]-ele[i-1]
+                dist[i] = np.sqrt(d*d+dist_ele*dist_ele)
+            else:
+                dist[i] = d
+
+        return dist
+
+    @njit(fastmath=True, cache=True)
+    def _nodup_distance_kernel(lat, lon, ele, use_ele, R, eps):
+        """
+        Returns the mask of non-duplicate points (lat, lon in radians) and the distance from each of them
+        to the previous non-duplicate point, in a single pass.
+        """
+
+        n = len(lat)
+        nodup = np.ones(n, dtype=np.bool_)
+        dist = np.zeros(n)
+
+        k = 0 # previous non-duplicate point
+
+        for i in range(1, n):
+            if abs(lat[i]-lat[i-1]) < eps and abs(lon[i]-lon[i-1]) < eps:
+                nodup[i] = False
+                continue
+
+            d = _latlon_distance(lat[k], lon[k], lat[i], lon[i], R)
 
-    return gpx_dist.tolist()
+            if use_ele:
+                dist_ele = ele[i]-ele[k]
+                dist[i] = np.sqrt(d*d+dist_ele*dist_ele)
+            else:
+                dist[i] = d
 
+            k = i
 
-def gpx_calculate_speed(gpx_data: GPXData) -> List[float]:
+        return nodup, dist
+else:
+    _haversine_kernel = _haversine_kernel_numpy
+
+
+def gpx_calculate_distance(gpx_data: GPXData, use_ele: bool = True) -> np.ndarray:
+    """
+    Returns the distance between GPX trackpoints.
+    if use_ele is True and gpx_data['ele'] is not None, the elevation data is used to compute the distance.
+    """
+
+    lat = np.radians(np.asarray(gpx_data['lat'], dtype=np.float64))
+    lon = np.radians(np.asarray(gpx_data['lon'], dtype=np.float64))
+
+    use_ele = _has_data(gpx_data['ele']) and use_ele
+    ele = np.asarray(gpx_data['ele'], dtype=np.float64) if use_ele else np.zeros(len(lat))
+
+    gpx_dist = _haversine_kernel(lat, lon, ele, use_ele, EARTH_RADIUS)
+
+    return gpx_dist
+
+
+def gpx_calculate_speed(gpx_data: GPXData, gpx_dist: Optional[np.ndarray] = None) -> np.ndarray:
     """
     Returns the speed between GPX trackpoints.
+    if gpx_dist is passed, it is used as the distance (with elevation) between the trackpoints.
     """
 
-    gpx_dist = gpx_calculate_distance(gpx_data, use_ele=True)
+    if gpx_dist is None:
+        gpx_dist = gpx_calculate_distance(gpx_data, use_ele=True)
 
-    gpx_dtstamp = np.diff(gpx_data['tstamp'], prepend=gpx_data['tstamp'][0])
-    gpx_dtstamp[gpx_dtstamp < EPS] = np.nan
+    gpx_dtstamp = np.diff(gpx_data['tstamp'])
 
-    gpx_speed = np.nan_to_num(gpx_dist/gpx_dtstamp, nan=0.0)
+    gpx_speed = np.zeros(len(gpx_dist))
+    np.divide(gpx_dist[1:], gpx_dtstamp, out=gpx_speed[1:], where=gpx_dtstamp >= EPS) # speed is 0.0 where the time step is too small
 
-    return gpx_speed.tolist()
+    return gpx_speed
 
 
 def gpx_remove_duplicates(gpx_data: GPXData) -> GPXData:
     """
-    Returns gpx_data where duplicate trackpoints are removed.
+    Returns gpx_data where duplicate trackpoints (same latitude and longitude as the previous trackpoint) are removed.
     """
 
-    gpx_dist = gpx_calculate_distance(gpx_data, use_ele=False)
+    lat = np.asarray(gpx_data['lat'], dtype=np.float64)
+    lon = np.asarray(gpx_data['lon'], dtype=np.float64)
 
-    i_dist = np.concatenate(([0], np.nonzero(gpx_dist)[0])) # keep gpx_dist[0] = 0.0
+    i_dup = (np.abs(np.diff(lat)) < DUPLICATE_EPS) & (np.abs(np.diff(lon)) < DUPLICATE_EPS)
 
-    if len(i_dist) == len(gpx_dist):
+    i_nodup = np.concatenate(([0], np.nonzero(~i_dup)[0]+1)) # always keep the first trackpoint
+
+    if len(i_nodup) >= len(lat):
         return gpx_data
 
-    gpx_data_nodup = {'lat': [], 'lon': [], 'ele': [], 'tstamp': [], 'tzinfo': gpx_data['tzinfo']}
+    return _gpx_select(gpx_data, i_nodup)
+
+
+def gpx_remove_duplicates_with_distance(gpx_data: GPXData) -> Tuple[GPXData, np.ndarray]:
+    """
+    Returns gpx_data where duplicate trackpoints are removed,
+    and the distance (with elevation if gpx_data['ele'] is not None) between the remaining trackpoints.
+    """
+
+    if not HAS_NUMBA:
+        gpx_data_nodup = gpx_remove_duplicates(gpx_data)
+
+        return gpx_data_nodup, gpx_calculate_distance(gpx_data_nodup, use_ele=True)
+
+    lat = np.radians(np.asarray(gpx_data['lat'], dtype=np.float64))
+    lon = np.radians(np.asarray(gpx_data['lon'], dtype=np.float64))
+
+    use_ele = _has_data(gpx_data['ele'])
+    ele = np.asarray(gpx_data['ele'], dtype=np.float64) if use_ele else np.zeros(len(lat))
+
+    nodup, gpx_dist = _nodup_distance_kernel(lat, lon, ele, use_ele, EARTH_RADIUS, np.radians(DUPLICATE_EPS))
+
+    i_nodup = np.nonzero(nodup)[0]
+
+    if len(i_nodup) >= len(lat):
+        return gpx_data, gpx_dist
+
+    return _gpx_select(gpx_data, i_nodup), gpx_dist[i_nodup]
+
+
+def _gpx_select(gpx_data: GPXData, i_select: np.ndarray) -> GPXData:
+    """
+    Returns gpx_data restricted to the trackpoints i_select.
+    """
+
+    gpx_data_select = {'lat': [], 'lon': [], 'ele': [], 'tstamp': [], 'tzinfo': gpx_data['tzinfo']}
 
     for k in ('lat', 'lon', 'ele', 'tstamp'):
-        gpx_data_nodup[k] = [gpx_data[k][i] for i in i_dist] if gpx_data[k] else None
+        gpx_data_select[k] = np.asarray(gpx_data[k], dtype=np.float64)[i_select] if _has_data(gpx_data[k]) else None
 
-    return gpx_data_nodup
+    return gpx_data_select
 
 
-def gpx_read(gpx_file: str) -> GPXData:
+def _gpx_iter_points_lxml(gpx_file: str) -> Iterator[Tuple[float, float, Optional[float], Optional[datetime]]]:
     """
-    Returns a GPXData structure from a GPX file.
+    Yields (lat, lon, ele, time) of the GPX trackpoints, streaming the file with lxml.
     """
 
-    gpx_data = {'lat': [], 'lon': [], 'ele': [], 'tstamp': [], 'tzinfo': None }
+    tags = ['{{{}}}trkpt'.format(ns) for ns in GPX_NAMESPACES]+['trkpt']
+
+    for _, elem in etree.iterparse(gpx_file, events=('end',), tag=tags):
+        ns = elem.tag[:-len('trkpt')]
+
+        ele = elem.findtext(ns+'ele')
+        time = elem.findtext(ns+'time')
+
+        yield (float(elem.attrib['lat']),
+               float(elem.attrib['lon']),
+               float(ele) if ele else None,
+               gpxpy.gpxfield.parse_time(time.strip()) if time else None)
 
-    i = 0
-    i_latlon = []
-    i_tstamp = []
+        # free the parsed trackpoints to keep memory bounded
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+def _gpx_iter_points_gpxpy(gpx_file: str) -> Iterator[Tuple[float, float, Optional[float], Optional[datetime]]]:
+    """
+    Yields (lat, lon, ele, time) of the GPX trackpoints, parsing the file with gpxpy.
+    """
 
     with open(gpx_file, 'r') as file:
         gpx = gpxpy.parse(file)
@@ -175,72 +365,94 @@ def gpx_read(gpx_file: str) -> GPXData:
         for track in gpx.tracks:
             for segment in track.segments:
                 for point in segment.points:
-                    gpx_data['lat'].append(point.latitude)
-                    gpx_data['lon'].append(point.longitude)
+                    yield point.latitude, point.longitude, point.elevation, point.time
 
-                    i_latlon.append(i)
 
-                    if point.elevation is not None:
-                        gpx_data['ele'].append(point.elevation)
-                    else:
-                        gpx_data['ele'].append(0.0)
+def gpx_read(gpx_file: str) -> GPXData:
+    """
+    Returns a GPXData structure from a GPX file.
+    """
 
-                    if point.time is not None:
-                        gpx_data['tstamp'].append(point.time.timestamp())
-                    else:
-                        gpx_data['tstamp'].append(0.0) ## set timestamp dummy
+    gpx_data = {'lat': array.array('d'), 'lon': array.array('d'), 'ele': array.array('d'), 'tstamp': array.array('d'), 'tzinfo': None } # contiguous doubles, no float objects
 
-                    try:
-                        gpx_data['tzinfo'] = point.time.tzinfo
-                    except:
-                        gpx_data['tzinfo'] = timezone.utc
+    gpx_points = _gpx_iter_points_lxml(gpx_file) if HAS_LXML else _gpx_iter_points_gpxpy(gpx_file)
 
-                    #   i_tstamp.append(i)
-                    # i += 1
+    for lat, lon, ele, time in gpx_points:
+        gpx_data['lat'].append(lat)
+        gpx_data['lon'].append(lon)
 
-    """
-    # remove trackpoints without tstamp
-    if i_tstamp and not len(i_latlon) == len(i_tstamp):
-        for k in ('lat', 'lon', 'ele', 'tstamp'):
-            gpx_data[k] = [gpx_data[k][i] for i in i_tstamp] if gpx_data[k] else None
-    """
+        if ele is not None:
+            gpx_data['ele'].append(ele)
+        else:
+            gpx_data['ele'].append(0.0)
+
+        if time is not None:
+            gpx_data['tstamp'].append(time.timestamp())
+        else:
+            gpx_data['tstamp'].append(0.0) ## set timestamp dummy
+
+        try:
+            gpx_data['tzinfo'] = time.tzinfo
+        except:
+            gpx_data['tzinfo'] = timezone.utc
+
+    for k in ('lat', 'lon', 'ele', 'tstamp'):
+        gpx_data[k] = np.frombuffer(gpx_data[k], dtype=np.float64).copy()
 
     return gpx_data
 
 
-def gpx_write(gpx_file: str, gpx_data: GPXData, gpx_dist, write_speed: bool = False) -> None:
+def gpx_write(gpx_file: str, gpx_data: GPXData, gpx_dist: Optional[np.ndarray] = None, write_speed: bool = False) -> None:
     """
     Writes a GPX file with a GPXData structure, including speed if write_speed is True.
+    if gpx_dist is passed, it is used as the distance (with elevation) between the trackpoints to compute the speed.
     """
 
     if write_speed:
-        if not gpx_data['tstamp']:
+        if not _has_data(gpx_data['tstamp']):
             raise ValueError('tstamp data is missing from gpx_data')
 
-        gpx_speed = gpx_calculate_speed(gpx_data)
+        gpx_speed = gpx_calculate_speed(gpx_data, gpx_dist)
+
+
+    version = '1.0' if write_speed else '1.1'
+    namespace = GPX_NAMESPACES[0] if write_speed else GPX_NAMESPACES[1]
+
+    n = len(gpx_data['lat'])
+
+    lats = np.asarray(gpx_data['lat']).tolist()
+    lons = np.asarray(gpx_data['lon']).tolist()
+    eles = np.asarray(gpx_data['ele']).tolist() if _has_data(gpx_data['ele']) else [None]*n
+    times = list(map(partial(datetime.fromtimestamp, tz=gpx_data['tzinfo']), np.asarray(gpx_data['tstamp']).tolist())) if _has_data(gpx_data['tstamp']) else [None]*n
+    speeds = gpx_speed.tolist() if write_speed else [None]*n
 
+    # the XML is formatted directly instead of building gpxpy objects for every trackpoint
+    gpx_xml = ['<?xml version="1.0" encoding="UTF-8"?>',
+               '<gpx xmlns="{0}" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="{0} {0}/gpx.xsd" version="{1}" creator="gpx-interpolate.py">'.format(namespace, version),
+               '  <trk>',
+               '    <trkseg>']
 
-    gpx = gpxpy.gpx.GPX()
-    gpx_track = gpxpy.gpx.GPXTrack()
-    gpx_segment = gpxpy.gpx.GPXTrackSegment()
+    for lat, lon, ele, time, speed in zip(lats, lons, eles, times, speeds):
+        gpx_xml.append('      <trkpt lat="{}" lon="{}">'.format(lat, lon))
 
-    gpx.tracks.append(gpx_track)
-    gpx_track.segments.append(gpx_segment)
+        if ele is not None:
+            gpx_xml.append('        <ele>{}</ele>'.format(ele))
 
-    for i in range(len(gpx_data['lat'])):
-        lat = gpx_data['lat'][i]
-        lon = gpx_data['lon'][i]
-        ele = gpx_data['ele'][i] if gpx_data['ele'] else None
-        time = datetime.fromtimestamp(gpx_data['tstamp'][i], tz=gpx_data['tzinfo']) if gpx_data['tstamp'] else None
-        speed = gpx_speed[i] if write_speed else None
+        if time is not None:
+            gpx_xml.append('        <time>{}</time>'.format(gpxpy.gpxfield.format_time(time)))
 
-        gpx_point = gpxpy.gpx.GPXTrackPoint(lat, lon, ele, time, speed=speed)
+        if speed is not None:
+            gpx_xml.append('        <speed>{}</speed>'.format(speed))
 
-        gpx_segment.points.append(gpx_point)
+        gpx_xml.append('      </trkpt>')
+
+    gpx_xml += ['    </trkseg>',
+                '  </trk>',
+                '</gpx>']
 
     try:
         with open(gpx_file, 'w') as file:
-            file.write(gpx.to_xml(version='1.0' if write_speed else '1.1'))
+            file.write('\n'.join(gpx_xml))
     except:
         exit('ERROR Failed to save {}'.format(gpx_file))
 
@@ -248,76 +460,103 @@ def gpx_write(gpx_file: str, gpx_data: GPXData, gpx_dist, write_speed: bool = Fa
 
 
 # main
-def main():
-    import argparse
+def _init_worker() -> None:
+    """
+    Limits a worker process to a single numba thread, as the files are already processed in parallel.
+    """
 
-    parser = argparse.ArgumentParser(description='interpolate GPX files using piecewise cubic Hermite splines')
+    if HAS_NUMBA:
+        set_num_threads(1)
 
-    parser.add_argument('gpx_files', metavar='FILE', nargs='+', help='GPX file')
-    parser.add_argument('-d', '--distance', type=float, default=1.0, help='set constant distance (interpolation resolution) between track points [m] (default: 1 m)')
-    parser.add_argument('-n', '--num', type=int, default=None, help='force number of track points (default: disabled)')
-    parser.add_argument('-i', '--intervaltime', type=float, help='set constant time interval [s] between track points')
-    parser.add_argument('-v', '--velocity', default=1.0, type=float, help='set constant velocity [m/s] between track points')
-    parser.add_argument('-s', '--speed', action='store_true', help='add speed data to track')
-    parser.add_argument('-b', '--begintime', help='set track begin time UTC [YYYYMMDD-HHMMSSZ]')
 
-    args = parser.parse_args()
+def process_file(gpx_file: str, args) -> str:
+    """
+    Interpolates a GPX file with the command line options args and writes the result to FILE_interpolated.gpx.
+    Returns the report of the processing.
+    """
+
+    log = []
+
+    gpx_data = gpx_read(gpx_file)
+
+    log.append('Read {} trackpoints from {}'.format(len(gpx_data['lat']), gpx_file))
+
+    gpx_data_nodup, gpx_dist = gpx_remove_duplicates_with_distance(gpx_data)
+
+    if not len(gpx_data_nodup['lat']) == len(gpx_data['lat']):
+        log.append('Removed {} duplicate trackpoint(s)'.format(len(gpx_data['lat'])-len(gpx_data_nodup['lat'])))
+
+    gpx_data = gpx_data_nodup
 
-    for gpx_file in args.gpx_files:
-        if not gpx_file.endswith('_interpolated.gpx'):
-            gpx_data = gpx_read(gpx_file)
+    gpx_data_interp = gpx_interpolate(gpx_data, args.distance, args.num, gpx_dist, args.method)
 
-            print('Read {} trackpoints from {}'.format(len(gpx_data['lat']), gpx_file))
+    gpx_cumdist = np.cumsum(gpx_dist) # accumulated distance at each trackpoint
 
-            gpx_data_nodup = gpx_remove_duplicates(gpx_data)
+    if args.begintime:
 
-            if not len(gpx_data_nodup['lat']) == len(gpx_data['lat']):
-                print('Removed {} duplicate trackpoint(s)'.format(len(gpx_data['lat'])-len(gpx_data_nodup['lat'])))
+        dt_utc = datetime.strptime( args.begintime, "%Y%m%d-%H%M%SZ").timestamp() - datetime(1970, 1, 1).timestamp()
+        deltatime = dt_utc - gpx_data['tstamp'][0]
 
-            gpx_data_interp = gpx_interpolate(gpx_data_nodup, args.distance, args.num)
+        gpx_data['tstamp'] = gpx_data['tstamp'] + deltatime
 
-            gpx_dist = gpx_calculate_distance(gpx_data, use_ele=True)
+    if args.velocity and args.velocity > 0.0:
 
-            if args.begintime:
+        gpx_data['tstamp'][1:] = gpx_data['tstamp'][0] + gpx_cumdist[1:]/args.velocity
 
-                dt_utc = datetime.strptime( args.begintime, "%Y%m%d-%H%M%SZ").timestamp() - datetime(1970, 1, 1).timestamp()
-                deltatime = dt_utc - gpx_data['tstamp'][0]
+    if args.intervaltime and args.intervaltime > 0.0:
 
-                for i in range(len(gpx_data['lat']) ):
-                    gpx_data['tstamp'][i] = gpx_data['tstamp'][i] + deltatime
+        gpx_data['tstamp'][1:] = gpx_data['tstamp'][0] + np.arange(1, len(gpx_data['tstamp']))*args.intervaltime
 
-            if args.velocity and args.velocity > 0.0:
 
-                gpx_dtstamps = np.divide(gpx_dist, args.velocity)
-                for i in range(len(gpx_data['lat']) - 1):
-                    gpx_data['tstamp'][i+1] = gpx_data['tstamp'][i]+gpx_dtstamps[i+1]
+    starttime = datetime.utcfromtimestamp(gpx_data['tstamp'][0]).isoformat()
+    endtime = datetime.utcfromtimestamp(gpx_data['tstamp'][-1]).isoformat()
 
-            if args.intervaltime and args.intervaltime > 0.0:
+    accumulateddistance = gpx_cumdist[-1]
+    log.append('Accumulated distance: {0:.2f} m'.format( accumulateddistance ))
 
-                for i in range(len(gpx_data['lat']) - 1):
-                    gpx_data['tstamp'][i+1] = gpx_data['tstamp'][i]+args.intervaltime
+    log.append('Track start time:     {}Z'.format( starttime ))
+    log.append('Track end time:       {}Z'.format( endtime ))
 
+    totaltime = gpx_data['tstamp'][-1] - gpx_data['tstamp'][0]
+    log.append('Total time:           {0:.2f} s'.format( totaltime ))
 
-            starttime = datetime.utcfromtimestamp(gpx_data['tstamp'][0]).isoformat()
-            endtime = datetime.utcfromtimestamp(gpx_data['tstamp'][-1]).isoformat()
+    averagespeed = accumulateddistance/totaltime
+    log.append('Average speed:        {0:.2f} m/s ({1:.2f} km/h)'.format( averagespeed, averagespeed*3.6 ))
 
-            accumulateddistance = np.sum(gpx_dist)
-            print( 'Accumulated distance: {0:.2f} m'.format( accumulateddistance ) )
+    output_file = '{}_interpolated.gpx'.format(gpx_file[:-4])
 
-            print( 'Track start time:     {}Z'.format( starttime ) )
-            print( 'Track end time:       {}Z'.format( endtime ) )
+    gpx_write(output_file, gpx_data_interp, write_speed=args.speed)
 
-            totaltime = gpx_data['tstamp'][-1] - gpx_data['tstamp'][0]
-            print( 'Total time:           {0:.2f} s'.format( totaltime ) )
+    log.append('{} trackpoints were written to {}'.format(len(gpx_data_interp['lat']), output_file))
 
-            averagespeed = accumulateddistance/totaltime
-            print( 'Average speed:        {0:.2f} m/s ({1:.2f} km/h)'.format( averagespeed, averagespeed*3.6 ) )
+    return '\n'.join(log)
 
-            output_file = '{}_interpolated.gpx'.format(gpx_file[:-4])
 
-            gpx_write(output_file, gpx_data_interp, gpx_dist, write_speed=args.speed)
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='interpolate GPX files using piecewise cubic Hermite splines')
+
+    parser.add_argument('gpx_files', metavar='FILE', nargs='+', help='GPX file')
+    parser.add_argument('-d', '--distance', type=float, default=1.0, help='set constant distance (interpolation resolution) between track points [m] (default: 1 m)')
+    parser.add_argument('-n', '--num', type=int, default=None, help='force number of track points (default: disabled)')
+    parser.add_argument('-i', '--intervaltime', type=float, help='set constant time interval [s] between track points')
+    parser.add_argument('-v', '--velocity', default=1.0, type=float, help='set constant velocity [m/s] between track points')
+    parser.add_argument('-s', '--speed', action='store_true', help='add speed data to track')
+    parser.add_argument('-b', '--begintime', help='set track begin time UTC [YYYYMMDD-HHMMSSZ]')
+    parser.add_argument('-m', '--method', choices=INTERPOLATION_METHODS, default='pchip', help='set interpolation method (default: pchip)')
+
+    args = parser.parse_args()
+
+    gpx_files = [gpx_file for gpx_file in args.gpx_files if not gpx_file.endswith('_interpolated.gpx')]
 
-            print('{} trackpoints were written to {}'.format(len(gpx_data_interp['lat']), output_file))
+    if len(gpx_files) > 1:
+        with ProcessPoolExecutor(initializer=_init_worker) as pool: # files are independent, process them in parallel
+            for report in pool.map(process_file, gpx_files, repeat(args), chunksize=1):
+                print(report)
+    else:
+        for gpx_file in gpx_files:
+            print(process_file(gpx_file, args))
 
 if __name__ == '__main__':
     main()
@@ -8,3 +8,7 @@ python -m pip install -U pip setuptools
 python -m pip install -r requirements.txt
 
 python -m doctest -o IGNORE_EXCEPTION_DETAIL -f tests/tests.txt || exit 1
+
+python -m pip install -r requirements-optional.txt
+
+python -m doctest -o IGNORE_EXCEPTION_DETAIL -f tests/tests.txt || exit 1